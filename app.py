@@ -4,18 +4,236 @@ Supports both plain-text (legacy DML) and hashed passwords during transition.
 Run migrate_passwords.py once to fully migrate to hashed passwords.
 """
 
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from functools import wraps
-from datetime import datetime
+from flask import Flask, Response, make_response, render_template, request, redirect, url_for, session, flash, g
+from flask_caching import Cache
+from flask_compress import Compress
+from flask.sessions import SessionInterface
+from flask_session import Session
+from functools import wraps, partial
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from types import SimpleNamespace
+from datetime import datetime, date
+from decimal import Decimal
+import csv
+import io
+import json
 import os
+import queue
+import redis
 import atexit
+import threading
+import time
+import psycopg
+from psycopg import sql
+from psycopg.rows import dict_row
+from psycopg.types.json import set_json_loads
 from psycopg_pool import ConnectionPool
 from werkzeug.security import generate_password_hash, check_password_hash
-from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
+from db import get_conninfo, is_password_hashed
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
+# Redis when REDIS_URL is set so every Gunicorn worker shares one cache;
+# otherwise a per-process in-memory cache for local development.
+if os.environ.get('REDIS_URL'):
+    cache = Cache(app, config={'CACHE_TYPE': 'RedisCache',
+                               'CACHE_REDIS_URL': os.environ['REDIS_URL']})
+else:
+    cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
+
+# With Redis available, keep session data server-side: the cookie carries only
+# a signed session id and logout deletes the stored session outright.
+# Without it, Flask's default signed-cookie sessions are used.
+if os.environ.get('REDIS_URL'):
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis.from_url(os.environ['REDIS_URL']),
+        SESSION_PERMANENT=False,
+        SESSION_USE_SIGNER=True,
+    )
+    Session(app)
+
+
+class StaticSessionBypass(SessionInterface):
+    """
+    Wraps the app's session interface so requests for static files get an empty
+    null session instead of loading one (a Redis GET under Flask-Session).
+    Flask opens the session before routing, so this matches on the URL path
+    rather than request.endpoint.
+    """
+
+    def __init__(self, wrapped):
+        self.wrapped = wrapped
+
+    def open_session(self, app, request):
+        if request.path.startswith(app.static_url_path + '/'):
+            return self.make_null_session(app)
+        return self.wrapped.open_session(app, request)
+
+    def save_session(self, app, session, response):
+        self.wrapped.save_session(app, session, response)
+
+
+app.session_interface = StaticSessionBypass(app.session_interface)
+
+# Compress HTML and static assets for clients that accept it. The
+# /member/events stream (text/event-stream) isn't listed, so it is never
+# buffered for compression.
+app.config.update(
+    COMPRESS_MIMETYPES=['text/html', 'text/css', 'application/javascript', 'application/json'],
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+)
+Compress(app)
+
+# TrainerAvailability.day_of_week is stored as ISO weekday 1-7; DAYS[n - 1] names it
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+app.jinja_env.globals['DAYS'] = DAYS
+
+
+# ============================================================================
+# SQL STATEMENTS
+# ============================================================================
+# Hot queries live here as module constants: the text is built once, and the
+# pool's configure hook prepares each of them on every new connection (see
+# PREPARED_STATEMENTS), so requests go straight to a cached server-side plan.
+
+# Login lookups by user table; see authenticate()
+LOGIN_SQL = {
+    table: f"""
+        SELECT {id_column}, first_name, full_name, password
+        FROM {table} WHERE lower(email) = lower(%s)
+    """
+    for table, id_column in (('Member', 'member_id'), ('Trainer', 'trainer_id'),
+                             ('AdminStaff', 'admin_id'))
+}
+
+MEMBER_DASHBOARD_SQL = """
+    WITH params AS (
+        SELECT %s::int AS member_id
+    ), dash AS (
+        -- MemberDashboard is refreshed in the background, so a brand-new
+        -- member may not have a row yet; fall back to empty counts
+        SELECT d.first_name, d.last_name, d.email, d.latest_weight,
+               d.latest_heart_rate, d.last_metric_date,
+               COALESCE(d.active_goals, 0) AS active_goals,
+               COALESCE(d.upcoming_sessions, 0) AS upcoming_sessions,
+               COALESCE(d.classes_attended, 0) AS classes_attended,
+               COALESCE(d.pending_balance, 0) AS pending_balance
+        FROM params p
+        LEFT JOIN MemberDashboard d ON d.member_id = p.member_id
+    ), goals AS (
+        SELECT COALESCE(json_agg(g ORDER BY g.target_date), '[]') AS goals
+        FROM (
+            SELECT goal_id, goal_type, current_value, target_value, target_date, status
+            FROM FitnessGoal, params p
+            WHERE FitnessGoal.member_id = p.member_id AND status = 'Active'
+        ) g
+    ), sess AS (
+        SELECT COALESCE(json_agg(s ORDER BY s.session_date, s.start_time), '[]') AS sessions
+        FROM (
+            SELECT pts.session_id, pts.session_date, pts.start_time, pts.end_time,
+                   t.full_name as trainer_name, r.room_name
+            FROM PersonalTrainingSession pts
+            JOIN params p ON pts.member_id = p.member_id
+            JOIN Trainer t ON pts.trainer_id = t.trainer_id
+            JOIN Room r ON pts.room_id = r.room_id
+            WHERE pts.session_date >= CURRENT_DATE
+              AND pts.status = 'Scheduled'
+            ORDER BY pts.session_date, pts.start_time
+            LIMIT 5
+        ) s
+    ), cls AS (
+        SELECT COALESCE(json_agg(c ORDER BY c.schedule_date, c.start_time), '[]') AS classes
+        FROM (
+            SELECT c.class_id, c.class_name, c.schedule_date, c.start_time, c.end_time,
+                   t.full_name as trainer_name, cr.status
+            FROM ClassRegistration cr
+            JOIN params p ON cr.member_id = p.member_id
+            JOIN Class c ON cr.class_id = c.class_id
+            JOIN Trainer t ON c.trainer_id = t.trainer_id
+            WHERE c.schedule_date >= CURRENT_DATE
+              AND cr.status = 'Registered'
+        ) c
+    )
+    SELECT row_to_json(dash) AS dashboard, goals.goals, sess.sessions, cls.classes
+    FROM dash, goals, sess, cls
+"""
+
+TRAINER_SESSIONS_SQL = """
+    SELECT pts.session_id, pts.session_date, pts.start_time, pts.end_time,
+           m.full_name as member_name,
+           r.room_name, pts.status, pts.notes
+    FROM PersonalTrainingSession pts
+    JOIN Member m ON pts.member_id = m.member_id
+    JOIN Room r ON pts.room_id = r.room_id
+    WHERE pts.trainer_id = %s
+      AND pts.session_date >= CURRENT_DATE
+      AND pts.status = 'Scheduled'
+    ORDER BY pts.session_date, pts.start_time
+"""
+
+TRAINER_CLASSES_SQL = """
+    SELECT c.class_id, c.class_name, c.schedule_date, c.start_time, c.end_time,
+           r.room_name, c.current_enrollment, c.capacity
+    FROM Class c
+    JOIN Room r ON c.room_id = r.room_id
+    WHERE c.trainer_id = %s
+      AND c.schedule_date >= CURRENT_DATE
+      AND c.status = 'Scheduled'
+    ORDER BY c.schedule_date, c.start_time
+"""
+
+# Weekly availability, Monday first then by start time (an ordered scan of
+# the no_overlap unique index)
+TRAINER_AVAILABILITY_SQL = """
+    SELECT availability_id, day_of_week, start_time, end_time
+    FROM TrainerAvailability
+    WHERE trainer_id = %s
+    ORDER BY day_of_week, start_time
+"""
+
+TRAINERS_SQL = """
+    SELECT t.trainer_id, t.first_name, t.last_name, t.specialization,
+           COALESCE(json_agg(json_build_object(
+                        'day', a.day_of_week,
+                        'start', to_char(a.start_time, 'HH24:MI'),
+                        'end', to_char(a.end_time, 'HH24:MI'))
+                    ORDER BY a.day_of_week, a.start_time)
+                    FILTER (WHERE a.availability_id IS NOT NULL), '[]') AS slots
+    FROM Trainer t
+    LEFT JOIN TrainerAvailability a ON a.trainer_id = t.trainer_id
+    GROUP BY t.trainer_id
+    ORDER BY t.trainer_id
+"""
+
+OPEN_CLASSES_SQL = """
+    SELECT c.class_id, c.class_name, c.schedule_date, c.start_time, c.end_time,
+           t.full_name as trainer_name,
+           c.current_enrollment, c.capacity,
+           (c.capacity - c.current_enrollment) as spots_left
+    FROM Class c
+    JOIN Trainer t ON c.trainer_id = t.trainer_id
+    WHERE c.schedule_date >= CURRENT_DATE
+      AND c.status = 'Scheduled'
+      AND c.current_enrollment < c.capacity
+    ORDER BY c.schedule_date, c.start_time
+"""
+
+# (statement, sentinel params) prepared when a pooled connection is created.
+# Param types must match what the handlers pass, since psycopg keys prepared
+# statements on query text plus parameter types.
+PREPARED_STATEMENTS = (
+    *((query, ('',)) for query in LOGIN_SQL.values()),
+    (MEMBER_DASHBOARD_SQL, (0,)),
+    (TRAINER_SESSIONS_SQL, (0,)),
+    (TRAINER_CLASSES_SQL, (0,)),
+    (TRAINER_AVAILABILITY_SQL, (0,)),
+    (TRAINERS_SQL, None),
+    (OPEN_CLASSES_SQL, None),
+)
+
 
 # ============================================================================
 # DATABASE CONNECTION POOL
@@ -24,67 +242,92 @@ app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-producti
 connection_pool = None
 
 
-def get_ssl_url(database_url):
-    """Add sslmode=require to DATABASE_URL if not already present."""
-    if database_url.startswith("postgres://") or database_url.startswith("postgresql://"):
-        url = urlparse(database_url)
-        qs = parse_qs(url.query)
-        if "sslmode" not in qs:
-            qs["sslmode"] = ["require"]
-        url = url._replace(query=urlencode(qs, doseq=True))
-        return urlunparse(url)
-    return database_url
+# Parse JSON numbers as Decimal so json_agg/row_to_json payloads keep NUMERIC
+# precision and format the same way as plain column values in templates.
+set_json_loads(partial(json.loads, parse_float=Decimal))
+
+
+# Session-wide limits for pooled connections, so one runaway query or an
+# abandoned transaction can't hold a pool slot indefinitely. Work that
+# legitimately runs longer raises it with SET LOCAL statement_timeout.
+STATEMENT_TIMEOUT = os.environ.get('DB_STATEMENT_TIMEOUT', '2s')
+IDLE_IN_TRANSACTION_TIMEOUT = os.environ.get('DB_IDLE_IN_TRANSACTION_TIMEOUT', '5s')
+
+# Set when DATABASE_URL points at PgBouncer in transaction-pooling mode.
+# Consecutive transactions may then run on different server connections, so
+# nothing session-level holds: prepared statements are switched off and the
+# timeouts above belong on the database role instead
+# (ALTER ROLE ... SET statement_timeout = '2s').
+PGBOUNCER = os.environ.get('DB_PGBOUNCER', '').lower() in ('1', 'true', 'yes')
+
+
+def configure_connection(conn):
+    """
+    Pool configure hook, run once per new connection: apply the timeouts
+    above, then PREPARE the hot statements. Skipped behind PgBouncer.
+    """
+    if PGBOUNCER:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT set_config('statement_timeout', %s, false), "
+                       "set_config('idle_in_transaction_session_timeout', %s, false)",
+                       (STATEMENT_TIMEOUT, IDLE_IN_TRANSACTION_TIMEOUT))
+        for query, params in PREPARED_STATEMENTS:
+            cursor.execute(query, params, prepare=True)
+    conn.commit()
 
 
 def init_db_pool():
+    """
+    Create the shared psycopg3 pool at import time.
+    The pool is thread-safe and warms connections up in background workers;
+    prepare_threshold=1 makes psycopg switch any query to a server-side
+    prepared statement on its second run on a connection, and
+    configure_connection() does so up front for the hottest ones (including the
+    login lookups), so they skip parse/plan from the first request. Both are
+    off behind PgBouncer (see PGBOUNCER).
+    dict_row returns every row as a dict keyed by column name, so handlers and
+    templates don't depend on SELECT column order.
+    """
     global connection_pool
-    database_url = os.environ.get("DATABASE_URL")
-
-    if not database_url:
-        database_url = (
-            f"host={os.environ.get('DB_HOST', 'localhost')} "
-            f"dbname={os.environ.get('DB_NAME', 'fitness_club')} "
-            f"user={os.environ.get('DB_USER', 'postgres')} "
-            f"password={os.environ.get('DB_PASSWORD', '')} "
-            f"port={os.environ.get('DB_PORT', '5432')}"
-        )
-    else:
-        database_url = get_ssl_url(database_url)
 
     try:
         connection_pool = ConnectionPool(
-            conninfo=database_url,
-            min_size=1,
-            max_size=5,
+            conninfo=get_conninfo(),
+            min_size=5,
+            max_size=20,
+            max_idle=300,
+            num_workers=3,
             timeout=30,
-            reconnect_timeout=60
+            reconnect_timeout=60,
+            kwargs={"prepare_threshold": None if PGBOUNCER else 1, "row_factory": dict_row},
+            configure=configure_connection,
+            open=True
         )
         # Verify pool works immediately on startup
-        conn = connection_pool.getconn()
-        connection_pool.putconn(conn)
+        connection_pool.wait()
         print("✓ Database connection pool initialized and verified")
     except Exception as e:
         print(f"✗ Database initialization failed: {e}")
         raise
 
 
-def get_db_connection():
-    return connection_pool.getconn()
-
-
-def return_db_connection(conn):
-    if conn is not None:
-        try:
-            connection_pool.putconn(conn)
-        except Exception as e:
-            print(f"Warning: could not return connection to pool: {e}")
+@contextmanager
+def get_conn():
+    """
+    Borrow a connection from the pool for the duration of a `with` block.
+    Commits when the block exits normally, rolls back if it raises, and always
+    hands the connection back to the pool.
+    """
+    with connection_pool.connection() as conn:
+        yield conn
 
 
 def close_db_pool():
     global connection_pool
     if connection_pool:
         try:
-            connection_pool.closeall()
+            connection_pool.close()
             print("✓ Database connection pool closed")
         except Exception as e:
             print(f"Warning: error closing pool: {e}")
@@ -94,10 +337,114 @@ atexit.register(close_db_pool)
 init_db_pool()
 
 
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+DASHBOARD_REFRESH_INTERVAL = 30  # seconds
+
+# NOTIFY channel announcing refreshed dashboards; the payload is a member_id
+DASHBOARD_CHANNEL = 'member_dashboard'
+
+
+def refresh_member_dashboard(force=False):
+    """
+    Drain MemberDashboardRefreshQueue and, if any writes were queued (or force
+    is set), rebuild the MemberDashboard materialized view. CONCURRENTLY keeps
+    the view readable by dashboard requests while it refreshes.
+    Each queued member is then notified on DASHBOARD_CHANNEL; NOTIFY is
+    delivered on commit, so listeners only hear of it once the new view is
+    visible.
+    """
+    with get_conn() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            WITH claimed AS (DELETE FROM MemberDashboardRefreshQueue RETURNING member_id)
+            SELECT COALESCE(array_agg(DISTINCT member_id), '{}') AS members FROM claimed
+        """)
+        members = cursor.fetchone()['members']
+        if members or force:
+            # A full rebuild can outlast the request-sized statement_timeout
+            cursor.execute("SET LOCAL statement_timeout = '60s'")
+            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY MemberDashboard")
+        if members:
+            cursor.execute("SELECT pg_notify(%s, member_id::text) FROM unnest(%s::int[]) AS member_id",
+                           (DASHBOARD_CHANNEL, members))
+
+
+def dashboard_refresher():
+    """Refresh loop; also forces a refresh once per day so date-based counts roll over."""
+    last_day = None
+    while True:
+        try:
+            today = date.today()
+            refresh_member_dashboard(force=today != last_day)
+            last_day = today
+        except Exception as e:
+            print(f"Warning: dashboard refresh failed: {e}")
+        time.sleep(DASHBOARD_REFRESH_INTERVAL)
+
+
+# Open /member/events streams in this worker: member_id -> set of queues
+dashboard_subscribers = {}
+dashboard_subscribers_lock = threading.Lock()
+
+
+def dashboard_listener():
+    """
+    The worker's single LISTEN connection on DASHBOARD_CHANNEL (outside the
+    pool, since it stays open). Each notification is handed to that member's
+    open streams, so open dashboards cost no database connection of their own.
+    """
+    while True:
+        try:
+            with psycopg.connect(get_conninfo(direct=True), autocommit=True) as conn:
+                conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(DASHBOARD_CHANNEL)))
+                for notify in conn.notifies():
+                    with dashboard_subscribers_lock:
+                        streams = list(dashboard_subscribers.get(int(notify.payload), ()))
+                    for updates in streams:
+                        updates.put('dashboard')
+        except Exception as e:
+            print(f"Warning: dashboard listener failed: {e}")
+            time.sleep(DASHBOARD_REFRESH_INTERVAL)
+
+
+threading.Thread(target=dashboard_refresher, daemon=True).start()
+threading.Thread(target=dashboard_listener, daemon=True).start()
+
+
 # ============================================================================
 # PASSWORD HELPERS
 # ============================================================================
 
+# Password hashing is deliberately slow CPU work (a few hundred ms per
+# check), so it runs on this pool instead of the request thread.
+HASH_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix='password-hash')
+
+# Under gunicorn's gevent worker, threading is monkey-patched and the
+# executor above would run on greenlets, blocking the worker's hub (and every
+# open event stream) for the whole hash. gevent's own threadpool uses real OS
+# threads; hashlib releases the GIL while hashing, so the hub keeps running.
+try:
+    from gevent import get_hub, monkey
+    GEVENT_ACTIVE = monkey.is_module_patched('threading')
+except ImportError:
+    GEVENT_ACTIVE = False
+
+
+def offload_hashing(fn, *args):
+    """Run a password hashing call off the request's thread or greenlet and wait for its result."""
+    if GEVENT_ACTIVE:
+        return get_hub().threadpool.apply(fn, args)
+    return HASH_EXECUTOR.submit(fn, *args).result()
+
+
+# Checked against when no account matches the email, so an unknown email
+# costs the same hash work as a wrong password and response time doesn't
+# reveal which emails are registered.
+DUMMY_PASSWORD_HASH = generate_password_hash('dummy-password')
+
+
 def verify_password(stored_password: str, provided_password: str) -> bool:
     """
     Verify a password against the stored value.
@@ -110,21 +457,56 @@ def verify_password(stored_password: str, provided_password: str) -> bool:
     if stored_password is None:
         return False
     # Check if it's a werkzeug hash
-    if stored_password.startswith("pbkdf2:") or stored_password.startswith("scrypt:"):
+    if is_password_hashed(stored_password):
         return check_password_hash(stored_password, provided_password)
     # Legacy plain-text fallback (DML users before migration)
     return stored_password == provided_password
 
 
+def authenticate(table: str, id_column: str, email: str, password: str):
+    """
+    Look a user up by email (case-insensitive, served by the lower(email)
+    index) and check the password. An unknown email is still checked against
+    DUMMY_PASSWORD_HASH so it takes as long as a wrong password.
+    The pooled connection is released before the hash check, which runs via
+    offload_hashing(), so a burst of logins doesn't hold connections other
+    requests are waiting on.
+    Legacy plain-text passwords are re-hashed on their first successful login.
+    """
+    with get_conn() as conn, conn.cursor() as cursor:
+        cursor.execute(LOGIN_SQL[table], (email,))
+        user = cursor.fetchone()
+    if user is None:
+        offload_hashing(check_password_hash, DUMMY_PASSWORD_HASH, password)
+        return None
+    if not offload_hashing(verify_password, user['password'], password):
+        return None
+    if not is_password_hashed(user['password']):
+        hashed_pw = offload_hashing(generate_password_hash, password)
+        with get_conn() as conn:
+            conn.execute(f"UPDATE {table} SET password = %s WHERE {id_column} = %s",
+                         (hashed_pw, user[id_column]))
+    return user
+
+
 # ============================================================================
 # AUTHENTICATION DECORATORS
 # ============================================================================
 
+@app.before_request
+def load_user():
+    """Read the logged-in user from the session once per request into g.user."""
+    # Static files get a null session (see StaticSessionBypass) and need no user
+    if request.endpoint == 'static':
+        return
+    g.user = SimpleNamespace(id=session.get('user_id'), type=session.get('user_type'))
+
+
 def login_required(user_type):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'user_id' not in session or session.get('user_type') != user_type:
+            if g.user.id is None or g.user.type != user_type:
                 flash('Please log in to access this page.', 'warning')
                 return redirect(url_for('index'))
             return f(*args, **kwargs)
@@ -132,6 +514,18 @@ def login_required(user_type):
     return decorator
 
 
+def render_conditional(template, **context):
+    """
+    Render a template with an ETag of the page body. Browsers revalidate on
+    every visit (no-cache) and get a bodiless 304 when nothing on the page
+    changed. Used for the read-mostly listing pages.
+    """
+    response = make_response(render_template(template, **context))
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
 # ============================================================================
 # MAIN ROUTES
 # ============================================================================
@@ -163,39 +557,30 @@ def member_register():
         phone      = request.form.get('phone')
         address    = request.form.get('address')
 
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT email FROM Member WHERE email = %s", (email,))
-            if cursor.fetchone():
-                cursor.close()
+            hashed_pw = offload_hashing(generate_password_hash, password)
+            with get_conn() as conn, conn.cursor() as cursor:
+                # The lower(email) unique index makes a duplicate a no-op:
+                # no row comes back instead of a separate lookup first
+                cursor.execute("""
+                    INSERT INTO Member (email, password, first_name, last_name, date_of_birth,
+                                       gender, phone, address)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT DO NOTHING
+                    RETURNING member_id
+                """, (email, hashed_pw, first_name, last_name, dob, gender, phone, address))
+                created = cursor.fetchone()
+
+            if created is None:
                 flash('Email already registered!', 'danger')
                 return redirect(url_for('member_register'))
 
-            hashed_pw = generate_password_hash(password)
-            cursor.execute("""
-                INSERT INTO Member (email, password, first_name, last_name, date_of_birth,
-                                   gender, phone, address)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING member_id
-            """, (email, hashed_pw, first_name, last_name, dob, gender, phone, address))
-
-            cursor.fetchone()
-            conn.commit()
-            cursor.close()
-
             flash(f"Registration successful! Welcome, {first_name}!", 'success')
             return redirect(url_for('member_login'))
 
         except Exception as e:
-            if conn:
-                conn.rollback()
             flash(f'Error: {str(e)}', 'danger')
             return redirect(url_for('member_register'))
-        finally:
-            return_db_connection(conn)
 
     return render_template('member/register.html')
 
@@ -207,30 +592,20 @@ def member_login():
         email    = request.form.get('email')
         password = request.form.get('password')
 
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT member_id, first_name, last_name, password
-                FROM Member WHERE email = %s
-            """, (email,))
-            user = cursor.fetchone()
-            cursor.close()
-
-            if user and verify_password(user[3], password):
-                session['user_id']   = user[0]
+            user = authenticate('Member', 'member_id', email, password)
+
+            if user:
+                session['user_id']   = user['member_id']
                 session['user_type'] = 'member'
-                session['user_name'] = f"{user[1]} {user[2]}"
-                flash(f'Welcome back, {user[1]}!', 'success')
+                session['user_name'] = user['full_name']
+                flash(f"Welcome back, {user['first_name']}!", 'success')
                 return redirect(url_for('member_dashboard'))
             else:
                 flash('Invalid credentials!', 'danger')
 
         except Exception as e:
             flash(f'Database error: {str(e)}', 'danger')
-        finally:
-            return_db_connection(conn)
 
     return render_template('member/login.html')
 
@@ -238,176 +613,232 @@ def member_login():
 @app.route('/member/dashboard')
 @login_required('member')
 def member_dashboard():
-    member_id = session['user_id']
-    conn = None
+    member_id = g.user.id
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_conn() as conn, conn.cursor() as cursor:
+            # One round-trip: the summary row plus each list as a JSON array
+            cursor.execute(MEMBER_DASHBOARD_SQL, (member_id,))
+            data = cursor.fetchone()
 
-        cursor.execute("""
-            SELECT first_name, last_name, email, latest_weight, latest_heart_rate,
-                   last_metric_date, active_goals, upcoming_sessions,
-                   classes_attended, pending_balance
-            FROM MemberDashboard WHERE member_id = %s
-        """, (member_id,))
-        dashboard_data = cursor.fetchone()
+        return render_template('member/dashboard.html', **data)
+    except Exception as e:
+        flash(f'Error loading dashboard: {str(e)}', 'danger')
+        return redirect(url_for('index'))
 
-        cursor.execute("""
-            SELECT goal_id, goal_type, current_value, target_value, target_date, status
-            FROM FitnessGoal
-            WHERE member_id = %s AND status = 'Active'
-            ORDER BY target_date
-        """, (member_id,))
-        goals = cursor.fetchall()
 
-        cursor.execute("""
-            SELECT pts.session_id, pts.session_date, pts.start_time, pts.end_time,
-                   t.first_name || ' ' || t.last_name as trainer_name, r.room_name
-            FROM PersonalTrainingSession pts
-            JOIN Trainer t ON pts.trainer_id = t.trainer_id
-            JOIN Room r ON pts.room_id = r.room_id
-            WHERE pts.member_id = %s
-              AND pts.session_date >= CURRENT_DATE
-              AND pts.status = 'Scheduled'
-            ORDER BY pts.session_date, pts.start_time
-            LIMIT 5
-        """, (member_id,))
-        sessions = cursor.fetchall()
+# Seconds between keepalive comments on an idle /member/events stream
+EVENTS_KEEPALIVE = 15
 
-        cursor.execute("""
-            SELECT c.class_id, c.class_name, c.schedule_date, c.start_time, c.end_time,
-                   t.first_name || ' ' || t.last_name as trainer_name, cr.status
-            FROM ClassRegistration cr
-            JOIN Class c ON cr.class_id = c.class_id
-            JOIN Trainer t ON c.trainer_id = t.trainer_id
-            WHERE cr.member_id = %s
-              AND c.schedule_date >= CURRENT_DATE
-              AND cr.status = 'Registered'
-            ORDER BY c.schedule_date, c.start_time
-        """, (member_id,))
-        classes = cursor.fetchall()
-        cursor.close()
 
-        return render_template('member/dashboard.html',
-                               dashboard=dashboard_data,
-                               goals=goals,
-                               sessions=sessions,
-                               classes=classes)
-    except Exception as e:
-        flash(f'Error loading dashboard: {str(e)}', 'danger')
-        return redirect(url_for('index'))
-    finally:
-        return_db_connection(conn)
+@app.route('/member/events')
+@login_required('member')
+def member_events():
+    """
+    Server-sent events for the member dashboard: a message each time this
+    member's MemberDashboard row has been refreshed after a change. The stream
+    subscribes to the worker's dashboard_listener() rather than holding a
+    database connection itself.
+    """
+    member_id = g.user.id
+
+    def stream():
+        updates = queue.Queue()
+        with dashboard_subscribers_lock:
+            dashboard_subscribers.setdefault(member_id, set()).add(updates)
+        try:
+            # Send something at once so the response headers go out immediately
+            yield ": listening\n\n"
+            while True:
+                try:
+                    yield f"data: {updates.get(timeout=EVENTS_KEEPALIVE)}\n\n"
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            with dashboard_subscribers_lock:
+                dashboard_subscribers[member_id].discard(updates)
+                if not dashboard_subscribers[member_id]:
+                    del dashboard_subscribers[member_id]
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+METRIC_COLUMNS = ('weight', 'height', 'heart_rate', 'blood_pressure',
+                  'body_fat_percentage', 'notes')
+
+
+def bulk_add_metrics(member_id, rows):
+    """
+    Insert many HealthMetric rows for one member with a single COPY.
+    `rows` are tuples in METRIC_COLUMNS order; COPY streams them in one
+    round-trip instead of parsing an INSERT per row.
+    """
+    with get_conn() as conn, conn.cursor() as cursor:
+        cursor.execute("SET LOCAL statement_timeout = '30s'")
+        with cursor.copy(
+            f"COPY HealthMetric (member_id, {', '.join(METRIC_COLUMNS)}) FROM STDIN"
+        ) as copy:
+            for row in rows:
+                copy.write_row((member_id, *row))
+
+
+def parse_metrics_csv(stream):
+    """
+    Read an uploaded metrics CSV (header row of METRIC_COLUMNS) into row tuples.
+    Raises ValueError if the header has unknown or missing columns; rows with
+    no metric values at all are skipped.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig'))
+    header = [name.strip().lower() for name in reader.fieldnames or ()]
+    unknown = [name for name in header if name not in METRIC_COLUMNS]
+    missing = [col for col in METRIC_COLUMNS if col not in header]
+    if unknown or missing:
+        problems = []
+        if unknown:
+            problems.append(f"unknown column(s) {', '.join(unknown)}")
+        if missing:
+            problems.append(f"missing column(s) {', '.join(missing)}")
+        raise ValueError(f"CSV header has {' and '.join(problems)}; "
+                         f"expected {', '.join(METRIC_COLUMNS)}")
+    reader.fieldnames = header
+
+    rows = []
+    for rec in reader:
+        weight, height, heart_rate, blood_pressure, body_fat, notes = (
+            (rec.get(col) or '').strip() for col in METRIC_COLUMNS)
+        if not (weight or height or heart_rate or blood_pressure or body_fat):
+            continue
+        rows.append((float(weight) if weight else None,
+                     float(height) if height else None,
+                     int(heart_rate) if heart_rate else None,
+                     blood_pressure if blood_pressure else None,
+                     float(body_fat) if body_fat else None,
+                     notes if notes else None))
+    return rows
 
 
 @app.route('/member/profile', methods=['GET', 'POST'])
 @login_required('member')
 def member_profile():
-    member_id = session['user_id']
+    member_id = g.user.id
 
     if request.method == 'POST':
         action = request.form.get('action')
-        conn = None
 
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
+        if action == 'import_metrics':
+            upload = request.files.get('metrics_file')
+            try:
+                rows = parse_metrics_csv(upload.stream) if upload else []
+                if rows:
+                    bulk_add_metrics(member_id, rows)
+                    flash(f'Imported {len(rows)} health metrics!', 'success')
+                else:
+                    flash('No metrics found in the uploaded file.', 'warning')
+            except Exception as e:
+                flash(f'Error: {str(e)}', 'danger')
+            return redirect(url_for('member_profile'))
 
-            if action == 'update_info':
-                phone   = request.form.get('phone')
-                address = request.form.get('address')
-                cursor.execute("""
-                    UPDATE Member SET phone = %s, address = %s WHERE member_id = %s
-                """, (phone, address, member_id))
-                conn.commit()
-                flash('Profile updated successfully!', 'success')
-
-            elif action == 'add_goal':
-                goal_type     = request.form.get('goal_type')
-                target_value  = request.form.get('target_value')
-                current_value = request.form.get('current_value')
-                target_date   = request.form.get('target_date')
-                cursor.execute("""
-                    INSERT INTO FitnessGoal (member_id, goal_type, target_value,
-                                            current_value, target_date, status)
-                    VALUES (%s, %s, %s, %s, %s, 'Active')
-                """, (member_id, goal_type, target_value, current_value, target_date))
-                conn.commit()
-                flash('Fitness goal added!', 'success')
-
-            elif action == 'add_metric':
-                weight        = request.form.get('weight')
-                height        = request.form.get('height')
-                heart_rate    = request.form.get('heart_rate')
-                blood_pressure = request.form.get('blood_pressure')
-                body_fat      = request.form.get('body_fat')
-                notes         = request.form.get('notes')
-                cursor.execute("""
-                    INSERT INTO HealthMetric (member_id, weight, height, heart_rate,
-                                             blood_pressure, body_fat_percentage, notes)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """, (member_id,
-                      float(weight) if weight else None,
-                      float(height) if height else None,
-                      int(heart_rate) if heart_rate else None,
-                      blood_pressure if blood_pressure else None,
-                      float(body_fat) if body_fat else None,
-                      notes if notes else None))
-                conn.commit()
-                flash('Health metric recorded!', 'success')
+        try:
+            with get_conn() as conn, conn.cursor() as cursor:
+                if action == 'update_info':
+                    phone   = request.form.get('phone')
+                    address = request.form.get('address')
+                    cursor.execute("""
+                        UPDATE Member SET phone = %s, address = %s WHERE member_id = %s
+                    """, (phone, address, member_id))
+                    conn.commit()
+                    flash('Profile updated successfully!', 'success')
+
+                elif action == 'add_goal':
+                    goal_type     = request.form.get('goal_type')
+                    target_value  = request.form.get('target_value')
+                    current_value = request.form.get('current_value')
+                    target_date   = request.form.get('target_date')
+                    cursor.execute("""
+                        INSERT INTO FitnessGoal (member_id, goal_type, target_value,
+                                                current_value, target_date, status)
+                        VALUES (%s, %s, %s, %s, %s, 'Active')
+                    """, (member_id, goal_type, target_value, current_value, target_date))
+                    conn.commit()
+                    flash('Fitness goal added!', 'success')
+
+                elif action == 'add_metric':
+                    weight        = request.form.get('weight')
+                    height        = request.form.get('height')
+                    heart_rate    = request.form.get('heart_rate')
+                    blood_pressure = request.form.get('blood_pressure')
+                    body_fat      = request.form.get('body_fat')
+                    notes         = request.form.get('notes')
+                    cursor.execute("""
+                        INSERT INTO HealthMetric (member_id, weight, height, heart_rate,
+                                                 blood_pressure, body_fat_percentage, notes)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    """, (member_id,
+                          float(weight) if weight else None,
+                          float(height) if height else None,
+                          int(heart_rate) if heart_rate else None,
+                          blood_pressure if blood_pressure else None,
+                          float(body_fat) if body_fat else None,
+                          notes if notes else None))
+                    conn.commit()
+                    flash('Health metric recorded!', 'success')
 
-            cursor.close()
 
         except Exception as e:
-            if conn:
-                conn.rollback()
             flash(f'Error: {str(e)}', 'danger')
-        finally:
-            return_db_connection(conn)
 
         return redirect(url_for('member_profile'))
 
     # GET
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT email, first_name, last_name, date_of_birth, gender, phone, address
-            FROM Member WHERE member_id = %s
-        """, (member_id,))
-        profile = cursor.fetchone()
-
-        cursor.execute("""
-            SELECT metric_id, recorded_date, weight, heart_rate, blood_pressure,
-                   body_fat_percentage, notes
-            FROM HealthMetric
-            WHERE member_id = %s ORDER BY recorded_date DESC LIMIT 10
-        """, (member_id,))
-        metrics = cursor.fetchall()
-
-        cursor.execute("""
-            SELECT goal_id, goal_type, current_value, target_value, target_date, status
-            FROM FitnessGoal WHERE member_id = %s ORDER BY created_date DESC
-        """, (member_id,))
-        goals = cursor.fetchall()
-        cursor.close()
+        # Pipeline mode sends all three queries before waiting on any result
+        with get_conn() as conn, conn.pipeline():
+            profile_cur = conn.execute("""
+                SELECT email, first_name, last_name, date_of_birth, gender, phone, address
+                FROM Member WHERE member_id = %s
+            """, (member_id,))
+
+            metrics_cur = conn.execute("""
+                SELECT metric_id, recorded_date, weight, heart_rate, blood_pressure,
+                       body_fat_percentage, notes
+                FROM HealthMetric
+                WHERE member_id = %s ORDER BY recorded_date DESC LIMIT 10
+            """, (member_id,))
+
+            goals_cur = conn.execute("""
+                SELECT goal_id, goal_type, current_value, target_value, target_date, status
+                FROM FitnessGoal WHERE member_id = %s ORDER BY created_date DESC
+            """, (member_id,))
+
+            profile = profile_cur.fetchone()
+            metrics = metrics_cur.fetchall()
+            goals = goals_cur.fetchall()
 
         return render_template('member/profile.html',
                                profile=profile, metrics=metrics, goals=goals)
     except Exception as e:
         flash(f'Error loading profile: {str(e)}', 'danger')
         return redirect(url_for('member_dashboard'))
-    finally:
-        return_db_connection(conn)
+
+
+@cache.cached(timeout=300, key_prefix='trainers_list')
+def get_trainers():
+    """
+    The trainer roster for the booking form, each trainer with their weekly
+    availability slots as a JSON array. It changes rarely, so it is cached for
+    5 minutes and dropped when a trainer adds availability.
+    """
+    with get_conn() as conn, conn.cursor() as cursor:
+        cursor.execute(TRAINERS_SQL)
+        trainers = cursor.fetchall()
+    return trainers
 
 
 @app.route('/member/schedule-training', methods=['GET', 'POST'])
 @login_required('member')
 def schedule_training():
-    member_id = session['user_id']
+    member_id = g.user.id
 
     if request.method == 'POST':
         trainer_id   = request.form.get('trainer_id')
@@ -416,164 +847,130 @@ def schedule_training():
         end_time     = request.form.get('end_time')
         notes        = request.form.get('notes')
 
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            day_of_week = datetime.strptime(session_date, '%Y-%m-%d').strftime('%A')
+            day_of_week = datetime.strptime(session_date, '%Y-%m-%d').isoweekday()
 
-            cursor.execute("""
-                SELECT availability_id FROM TrainerAvailability
-                WHERE trainer_id = %s AND day_of_week = %s
-                  AND start_time <= %s AND end_time >= %s
-            """, (trainer_id, day_of_week, start_time, end_time))
+            with get_conn() as conn, conn.pipeline(), conn.cursor() as cursor:
+                # Serialise bookings for the same day so two requests cannot both
+                # pass the checks below and double-book a trainer or a room.
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext('pts:' || %s))",
+                               (session_date,))
 
-            if not cursor.fetchone():
-                cursor.close()
+                # Availability, trainer conflict, free room and the INSERT in one
+                # statement; the flags say which check failed if nothing was booked.
+                cursor.execute("""
+                    WITH slot AS (
+                        SELECT tsrange(%(session_date)s::date + %(start_time)s::time,
+                                       %(session_date)s::date + %(end_time)s::time) AS period
+                    ), avail AS (
+                        SELECT 1 FROM TrainerAvailability
+                        WHERE trainer_id = %(trainer_id)s AND day_of_week = %(day_of_week)s
+                          AND start_time <= %(start_time)s AND end_time >= %(end_time)s
+                    ), busy AS (
+                        SELECT 1 FROM PersonalTrainingSession, slot
+                        WHERE trainer_id = %(trainer_id)s AND status = 'Scheduled'
+                          AND tsrange(session_date + start_time, session_date + end_time) && slot.period
+                    ), free_room AS (
+                        SELECT r.room_id FROM Room r, slot
+                        WHERE r.room_type = 'Personal Training'
+                          AND NOT EXISTS (
+                              SELECT 1 FROM PersonalTrainingSession pts
+                              WHERE pts.room_id = r.room_id AND pts.status = 'Scheduled'
+                                AND tsrange(pts.session_date + pts.start_time,
+                                            pts.session_date + pts.end_time) && slot.period
+                          )
+                        LIMIT 1
+                    ), ins AS (
+                        INSERT INTO PersonalTrainingSession
+                            (member_id, trainer_id, room_id, session_date, start_time, end_time, status, notes)
+                        SELECT %(member_id)s, %(trainer_id)s, room_id, %(session_date)s,
+                               %(start_time)s, %(end_time)s, 'Scheduled', %(notes)s
+                        FROM free_room
+                        WHERE EXISTS (SELECT 1 FROM avail) AND NOT EXISTS (SELECT 1 FROM busy)
+                        RETURNING session_id
+                    )
+                    SELECT EXISTS (SELECT 1 FROM avail) AS available,
+                           EXISTS (SELECT 1 FROM busy) AS trainer_busy,
+                           (SELECT session_id FROM ins) AS session_id
+                """, {'member_id': member_id, 'trainer_id': trainer_id,
+                      'day_of_week': day_of_week, 'session_date': session_date,
+                      'start_time': start_time, 'end_time': end_time, 'notes': notes})
+
+                booking = cursor.fetchone()
+
+            if not booking['available']:
                 flash('Trainer not available at this time!', 'danger')
                 return redirect(url_for('schedule_training'))
-
-            cursor.execute("""
-                SELECT session_id FROM PersonalTrainingSession
-                WHERE trainer_id = %s AND session_date = %s AND status = 'Scheduled'
-                  AND (
-                      (start_time <= %s AND end_time > %s) OR
-                      (start_time < %s AND end_time >= %s) OR
-                      (start_time >= %s AND end_time <= %s)
-                  )
-            """, (trainer_id, session_date, start_time, start_time,
-                  end_time, end_time, start_time, end_time))
-
-            if cursor.fetchone():
-                cursor.close()
+            if booking['trainer_busy']:
                 flash('Trainer already has a session at this time!', 'danger')
                 return redirect(url_for('schedule_training'))
-
-            cursor.execute("""
-                SELECT room_id FROM Room
-                WHERE room_type = 'Personal Training'
-                  AND room_id NOT IN (
-                      SELECT room_id FROM PersonalTrainingSession
-                      WHERE session_date = %s AND status = 'Scheduled'
-                        AND (
-                            (start_time <= %s AND end_time > %s) OR
-                            (start_time < %s AND end_time >= %s) OR
-                            (start_time >= %s AND end_time <= %s)
-                        )
-                  )
-                LIMIT 1
-            """, (session_date, start_time, start_time, end_time, end_time, start_time, end_time))
-
-            room = cursor.fetchone()
-            if not room:
-                cursor.close()
+            if booking['session_id'] is None:
                 flash('No rooms available at this time!', 'danger')
                 return redirect(url_for('schedule_training'))
 
-            cursor.execute("""
-                INSERT INTO PersonalTrainingSession
-                    (member_id, trainer_id, room_id, session_date, start_time, end_time, status, notes)
-                VALUES (%s, %s, %s, %s, %s, %s, 'Scheduled', %s)
-                RETURNING session_id
-            """, (member_id, trainer_id, room[0], session_date, start_time, end_time, notes))
-
-            cursor.fetchone()
-            conn.commit()
-            cursor.close()
-
             flash('Session booked successfully!', 'success')
             return redirect(url_for('member_dashboard'))
 
         except Exception as e:
-            if conn:
-                conn.rollback()
             flash(f'Error: {str(e)}', 'danger')
             return redirect(url_for('schedule_training'))
-        finally:
-            return_db_connection(conn)
 
     # GET
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT trainer_id, first_name, last_name, specialization
-            FROM Trainer ORDER BY trainer_id
-        """)
-        trainers = cursor.fetchall()
-        cursor.close()
-        return render_template('member/schedule_training.html', trainers=trainers)
+        return render_conditional('member/schedule_training.html', trainers=get_trainers())
     except Exception as e:
         flash(f'Error: {str(e)}', 'danger')
         return redirect(url_for('member_dashboard'))
-    finally:
-        return_db_connection(conn)
+
+
+@cache.cached(timeout=30, key_prefix='open_classes')
+def get_open_classes():
+    """
+    Upcoming classes with free spots. Cached for 30 seconds so a burst of
+    members opening the page when classes are released costs one query;
+    registrations drop the entry so spot counts don't lag.
+    """
+    with get_conn() as conn, conn.cursor() as cursor:
+        cursor.execute(OPEN_CLASSES_SQL)
+        classes = cursor.fetchall()
+    return classes
 
 
 @app.route('/member/classes', methods=['GET', 'POST'])
 @login_required('member')
 def member_classes():
-    member_id = session['user_id']
+    member_id = g.user.id
 
     if request.method == 'POST':
         class_id = request.form.get('class_id')
-        conn = None
 
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT registration_id FROM ClassRegistration
-                WHERE member_id = %s AND class_id = %s
-            """, (member_id, class_id))
-
-            if cursor.fetchone():
-                flash('Already registered for this class!', 'warning')
-            else:
+            with get_conn() as conn, conn.cursor() as cursor:
+                # unique_registration makes this idempotent: no row back
+                # means the member was already registered
                 cursor.execute("""
                     INSERT INTO ClassRegistration (member_id, class_id, status)
                     VALUES (%s, %s, 'Registered')
+                    ON CONFLICT (member_id, class_id) DO NOTHING
+                    RETURNING registration_id
                 """, (member_id, class_id))
-                conn.commit()
-                flash('Successfully registered for class!', 'success')
 
-            cursor.close()
+                if cursor.fetchone() is None:
+                    flash('Already registered for this class!', 'warning')
+                else:
+                    conn.commit()
+                    cache.delete('open_classes')
+                    flash('Successfully registered for class!', 'success')
 
         except Exception as e:
-            if conn:
-                conn.rollback()
             flash(f'Error: {str(e)}', 'danger')
-        finally:
-            return_db_connection(conn)
 
     # GET
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT c.class_id, c.class_name, c.schedule_date, c.start_time, c.end_time,
-                   t.first_name || ' ' || t.last_name as trainer_name,
-                   c.current_enrollment, c.capacity,
-                   (c.capacity - c.current_enrollment) as spots_left
-            FROM Class c
-            JOIN Trainer t ON c.trainer_id = t.trainer_id
-            WHERE c.schedule_date >= CURRENT_DATE
-              AND c.status = 'Scheduled'
-              AND c.current_enrollment < c.capacity
-            ORDER BY c.schedule_date, c.start_time
-        """)
-        classes = cursor.fetchall()
-        cursor.close()
-        return render_template('member/classes.html', classes=classes)
+        return render_template('member/classes.html', classes=get_open_classes())
     except Exception as e:
         flash(f'Error: {str(e)}', 'danger')
         return redirect(url_for('member_dashboard'))
-    finally:
-        return_db_connection(conn)
 
 
 # ============================================================================
@@ -587,194 +984,175 @@ def trainer_login():
         email    = request.form.get('email')
         password = request.form.get('password')
 
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT trainer_id, first_name, last_name, password
-                FROM Trainer WHERE email = %s
-            """, (email,))
-            user = cursor.fetchone()
-            cursor.close()
-
-            if user and verify_password(user[3], password):
-                session['user_id']   = user[0]
+            user = authenticate('Trainer', 'trainer_id', email, password)
+
+            if user:
+                session['user_id']   = user['trainer_id']
                 session['user_type'] = 'trainer'
-                session['user_name'] = f"{user[1]} {user[2]}"
-                flash(f'Welcome back, {user[1]}!', 'success')
+                session['user_name'] = user['full_name']
+                flash(f"Welcome back, {user['first_name']}!", 'success')
                 return redirect(url_for('trainer_schedule'))
             else:
                 flash('Invalid credentials!', 'danger')
 
         except Exception as e:
             flash(f'Database error: {str(e)}', 'danger')
-        finally:
-            return_db_connection(conn)
 
     return render_template('trainer/login.html')
 
 
+def availability_cache_key(trainer_id):
+    """
+    Cache key for a trainer's availability slots. Availability changes a few
+    times a week at most, so trainer_schedule caches it per trainer and the
+    trainer_availability POST drops the entry.
+    """
+    return f'trainer_availability:{trainer_id}'
+
+
 @app.route('/trainer/schedule')
 @login_required('trainer')
 def trainer_schedule():
-    trainer_id = session['user_id']
-    conn = None
+    trainer_id = g.user.id
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT pts.session_id, pts.session_date, pts.start_time, pts.end_time,
-                   m.first_name || ' ' || m.last_name as member_name,
-                   r.room_name, pts.status, pts.notes
-            FROM PersonalTrainingSession pts
-            JOIN Member m ON pts.member_id = m.member_id
-            JOIN Room r ON pts.room_id = r.room_id
-            WHERE pts.trainer_id = %s
-              AND pts.session_date >= CURRENT_DATE
-              AND pts.status = 'Scheduled'
-            ORDER BY pts.session_date, pts.start_time
-        """, (trainer_id,))
-        sessions = cursor.fetchall()
-
-        cursor.execute("""
-            SELECT c.class_id, c.class_name, c.schedule_date, c.start_time, c.end_time,
-                   r.room_name, c.current_enrollment, c.capacity
-            FROM Class c
-            JOIN Room r ON c.room_id = r.room_id
-            WHERE c.trainer_id = %s
-              AND c.schedule_date >= CURRENT_DATE
-              AND c.status = 'Scheduled'
-            ORDER BY c.schedule_date, c.start_time
-        """, (trainer_id,))
-        classes = cursor.fetchall()
-
-        cursor.execute("""
-            SELECT availability_id, day_of_week, start_time, end_time
-            FROM TrainerAvailability
-            WHERE trainer_id = %s
-            ORDER BY
-                CASE day_of_week
-                    WHEN 'Monday'    THEN 1
-                    WHEN 'Tuesday'   THEN 2
-                    WHEN 'Wednesday' THEN 3
-                    WHEN 'Thursday'  THEN 4
-                    WHEN 'Friday'    THEN 5
-                    WHEN 'Saturday'  THEN 6
-                    WHEN 'Sunday'    THEN 7
-                END, start_time
-        """, (trainer_id,))
-        availability = cursor.fetchall()
-        cursor.close()
-
-        return render_template('trainer/schedule.html',
-                               sessions=sessions,
-                               classes=classes,
-                               availability=availability)
+        availability = cache.get(availability_cache_key(trainer_id))
+
+        # Pipeline mode sends all the queries before waiting on any result;
+        # availability rides along only when it isn't cached
+        with get_conn() as conn, conn.pipeline():
+            sessions_cur = conn.execute(TRAINER_SESSIONS_SQL, (trainer_id,))
+            classes_cur = conn.execute(TRAINER_CLASSES_SQL, (trainer_id,))
+            if availability is None:
+                availability_cur = conn.execute(TRAINER_AVAILABILITY_SQL, (trainer_id,))
+            sessions = sessions_cur.fetchall()
+            classes = classes_cur.fetchall()
+            if availability is None:
+                availability = availability_cur.fetchall()
+                cache.set(availability_cache_key(trainer_id), availability, timeout=60)
+
+        return render_conditional('trainer/schedule.html',
+                                  sessions=sessions,
+                                  classes=classes,
+                                  availability=availability)
     except Exception as e:
         flash(f'Error loading schedule: {str(e)}', 'danger')
         return redirect(url_for('index'))
-    finally:
-        return_db_connection(conn)
 
 
 @app.route('/trainer/availability', methods=['GET', 'POST'])
 @login_required('trainer')
 def trainer_availability():
-    trainer_id = session['user_id']
+    trainer_id = g.user.id
 
     if request.method == 'POST':
-        day_of_week = request.form.get('day_of_week')
-        start_time  = request.form.get('start_time')
-        end_time    = request.form.get('end_time')
+        start_time = request.form.get('start_time')
+        end_time   = request.form.get('end_time')
 
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO TrainerAvailability (trainer_id, day_of_week, start_time, end_time)
-                VALUES (%s, %s, %s, %s)
-            """, (trainer_id, day_of_week, start_time, end_time))
-            conn.commit()
-            cursor.close()
+            # The same hours can be set for several days in one submit
+            days = [int(day) for day in request.form.getlist('day_of_week')]
+            if not all(1 <= day <= 7 for day in days):
+                raise ValueError
+        except ValueError:
+            flash('Invalid day of week!', 'danger')
+            return render_template('trainer/availability.html')
+
+        if not days:
+            flash('Select at least one day!', 'warning')
+            return render_template('trainer/availability.html')
+
+        try:
+            with get_conn() as conn, conn.cursor() as cursor:
+                # executemany pipelines the rows: one round-trip for the batch
+                cursor.executemany("""
+                    INSERT INTO TrainerAvailability (trainer_id, day_of_week, start_time, end_time)
+                    VALUES (%s, %s, %s, %s)
+                """, [(trainer_id, day, start_time, end_time) for day in days])
+                conn.commit()
+            cache.delete(availability_cache_key(trainer_id))
+            cache.delete('trainers_list')
             flash('Availability set successfully!', 'success')
             return redirect(url_for('trainer_schedule'))
         except Exception as e:
-            if conn:
-                conn.rollback()
             flash(f'Error: {str(e)}', 'danger')
-        finally:
-            return_db_connection(conn)
 
     return render_template('trainer/availability.html')
 
 
+def fetch_trainer_members(cursor, trainer_id, member_id=None):
+    """
+    Members who have trained with trainer_id, each pre-joined with their latest
+    HealthMetric and active goals (as a JSON array) in one query, so neither
+    the list nor the detail page issues per-member follow-up queries.
+    Pass member_id to fetch a single member for the detail page.
+    """
+    member_filter = "AND m.member_id = %s" if member_id is not None else ""
+    params = (trainer_id, member_id) if member_id is not None else (trainer_id,)
+
+    cursor.execute(f"""
+        SELECT m.member_id, m.first_name, m.last_name, m.email, m.date_of_birth, m.phone,
+               h.weight, h.height, h.heart_rate, h.blood_pressure, h.recorded_date,
+               COALESCE(g.goals, '[]') AS goals
+        FROM Member m
+        LEFT JOIN LATERAL (
+            SELECT weight, height, heart_rate, blood_pressure, recorded_date
+            FROM HealthMetric WHERE member_id = m.member_id
+            ORDER BY recorded_date DESC LIMIT 1
+        ) h ON true
+        LEFT JOIN LATERAL (
+            SELECT json_agg(json_build_object(
+                       'goal_type', goal_type, 'current_value', current_value,
+                       'target_value', target_value, 'target_date', target_date)) AS goals
+            FROM FitnessGoal WHERE member_id = m.member_id AND status = 'Active'
+        ) g ON true
+        -- Semi-join: stops at the first session per member, nothing to dedupe
+        WHERE EXISTS (
+            SELECT 1 FROM PersonalTrainingSession pts
+            WHERE pts.trainer_id = %s AND pts.member_id = m.member_id
+        ) {member_filter}
+        ORDER BY m.last_name, m.first_name
+    """, params)
+    return cursor.fetchall()
+
+
 @app.route('/trainer/members')
 @login_required('trainer')
 def trainer_members():
-    trainer_id = session['user_id']
-    conn = None
+    trainer_id = g.user.id
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT m.member_id, m.first_name, m.last_name, m.email, m.phone
-            FROM Member m
-            JOIN PersonalTrainingSession pts ON m.member_id = pts.member_id
-            WHERE pts.trainer_id = %s
-            ORDER BY m.last_name, m.first_name
-        """, (trainer_id,))
-        members = cursor.fetchall()
-        cursor.close()
+        with get_conn() as conn, conn.cursor() as cursor:
+            members = fetch_trainer_members(cursor, trainer_id)
+
         return render_template('trainer/members.html', members=members)
     except Exception as e:
         flash(f'Error: {str(e)}', 'danger')
         return redirect(url_for('trainer_schedule'))
-    finally:
-        return_db_connection(conn)
 
 
 @app.route('/trainer/member/<int:member_id>')
 @login_required('trainer')
 def trainer_member_detail(member_id):
-    conn = None
+    trainer_id = g.user.id
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT first_name, last_name, email, date_of_birth, phone
-            FROM Member WHERE member_id = %s
-        """, (member_id,))
-        member = cursor.fetchone()
+        with get_conn() as conn, conn.cursor() as cursor:
+            rows = fetch_trainer_members(cursor, trainer_id, member_id)
 
-        cursor.execute("""
-            SELECT weight, height, heart_rate, blood_pressure, body_fat_percentage, recorded_date
-            FROM HealthMetric WHERE member_id = %s
-            ORDER BY recorded_date DESC LIMIT 1
-        """, (member_id,))
-        metric = cursor.fetchone()
-
-        cursor.execute("""
-            SELECT goal_type, current_value, target_value, target_date
-            FROM FitnessGoal WHERE member_id = %s AND status = 'Active'
-        """, (member_id,))
-        goals = cursor.fetchall()
-        cursor.close()
+        if not rows:
+            flash('Member not found.', 'warning')
+            return redirect(url_for('trainer_members'))
 
+        row = rows[0]
         return render_template('trainer/member_detail.html',
-                               member=member, metric=metric,
-                               goals=goals, member_id=member_id)
+                               member=row,
+                               metric=row if row['recorded_date'] is not None else None,
+                               goals=row['goals'], member_id=member_id)
     except Exception as e:
         flash(f'Error: {str(e)}', 'danger')
         return redirect(url_for('trainer_members'))
-    finally:
-        return_db_connection(conn)
 
 
 # ============================================================================
@@ -788,91 +1166,140 @@ def admin_login():
         email    = request.form.get('email')
         password = request.form.get('password')
 
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT admin_id, first_name, last_name, password
-                FROM AdminStaff WHERE email = %s
-            """, (email,))
-            user = cursor.fetchone()
-            cursor.close()
-
-            if user and verify_password(user[3], password):
-                session['user_id']   = user[0]
+            user = authenticate('AdminStaff', 'admin_id', email, password)
+
+            if user:
+                session['user_id']   = user['admin_id']
                 session['user_type'] = 'admin'
-                session['user_name'] = f"{user[1]} {user[2]}"
-                flash(f'Welcome back, {user[1]}!', 'success')
+                session['user_name'] = user['full_name']
+                flash(f"Welcome back, {user['first_name']}!", 'success')
                 return redirect(url_for('admin_dashboard'))
             else:
                 flash('Invalid credentials!', 'danger')
 
         except Exception as e:
             flash(f'Database error: {str(e)}', 'danger')
-        finally:
-            return_db_connection(conn)
 
     return render_template('admin/login.html')
 
 
+@cache.cached(timeout=30, key_prefix='admin_stats')
+def get_admin_stats():
+    """
+    The dashboard's system-wide counters. They scan whole tables, so they are
+    computed at most every 30 seconds rather than per hit; billing changes
+    drop the entry so pending revenue doesn't lag.
+    """
+    with get_conn() as conn, conn.cursor() as cursor:
+        # All four stats in one round-trip
+        cursor.execute("""
+            SELECT (SELECT COUNT(*) FROM Member) AS total_members,
+                   (SELECT COUNT(*) FROM Trainer) AS total_trainers,
+                   (SELECT COUNT(*) FROM Class
+                    WHERE schedule_date >= CURRENT_DATE AND status = 'Scheduled') AS upcoming_classes,
+                   (SELECT COALESCE(SUM(total_amount - amount_paid), 0)
+                    FROM Bill WHERE status = 'Pending') AS pending_revenue
+        """)
+        return cursor.fetchone()
+
+
 @app.route('/admin/dashboard')
 @login_required('admin')
 def admin_dashboard():
-    conn = None
-
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT COUNT(*) FROM Member")
-        total_members = cursor.fetchone()[0]
+        return render_template('admin/dashboard.html', classes=get_open_classes(), **get_admin_stats())
+    except Exception as e:
+        flash(f'Error loading dashboard: {str(e)}', 'danger')
+        return redirect(url_for('index'))
 
-        cursor.execute("SELECT COUNT(*) FROM Trainer")
-        total_trainers = cursor.fetchone()[0]
 
+def bulk_register(class_id, member_ids):
+    """
+    Register a cohort of members for a class in one statement: the ids go
+    over as a single array parameter instead of one INSERT round-trip each.
+    Members already registered are skipped; if the cohort would overflow the
+    class, the capacity check rejects the whole batch. Nothing is inserted if
+    the class or any of the members doesn't exist.
+    Returns a row with class_found, unknown_members (ids with no Member row)
+    and added (how many registrations were added).
+    """
+    with get_conn() as conn, conn.cursor() as cursor:
         cursor.execute("""
-            SELECT COUNT(*) FROM Class
-            WHERE schedule_date >= CURRENT_DATE AND status = 'Scheduled'
-        """)
-        upcoming_classes = cursor.fetchone()[0]
+            WITH cls AS (
+                SELECT class_id FROM Class WHERE class_id = %(class_id)s
+            ), known AS (
+                SELECT member_id FROM Member WHERE member_id = ANY(%(member_ids)s::int[])
+            ), ins AS (
+                INSERT INTO ClassRegistration (member_id, class_id, status)
+                SELECT known.member_id, cls.class_id, 'Registered'
+                FROM cls, known
+                WHERE (SELECT count(*) FROM known) = cardinality(%(member_ids)s::int[])
+                ON CONFLICT (member_id, class_id) DO NOTHING
+                RETURNING 1
+            )
+            SELECT EXISTS (SELECT 1 FROM cls) AS class_found,
+                   ARRAY(SELECT unnest(%(member_ids)s::int[])
+                         EXCEPT SELECT member_id FROM known ORDER BY 1) AS unknown_members,
+                   (SELECT count(*) FROM ins) AS added
+        """, {'class_id': class_id, 'member_ids': member_ids})
+        return cursor.fetchone()
+
+
+@app.route('/admin/classes/register', methods=['POST'])
+@login_required('admin')
+def admin_register_members():
+    """Bulk-register members (ids separated by commas or whitespace) for a class."""
+    try:
+        class_id = int(request.form.get('class_id'))
+    except (TypeError, ValueError):
+        flash('Invalid class!', 'danger')
+        return redirect(url_for('admin_dashboard'))
 
-        cursor.execute("""
-            SELECT COALESCE(SUM(total_amount - amount_paid), 0)
-            FROM Bill WHERE status = 'Pending'
-        """)
-        pending_revenue = cursor.fetchone()[0]
-        cursor.close()
-
-        return render_template('admin/dashboard.html',
-                               total_members=total_members,
-                               total_trainers=total_trainers,
-                               upcoming_classes=upcoming_classes,
-                               pending_revenue=pending_revenue)
+    try:
+        member_ids = sorted({int(m) for m in request.form.get('member_ids', '').replace(',', ' ').split()})
+    except ValueError:
+        flash('Member IDs must be numbers!', 'danger')
+        return redirect(url_for('admin_dashboard'))
+    if not member_ids:
+        flash('Enter at least one member ID!', 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+    try:
+        result = bulk_register(class_id, member_ids)
+        if not result['class_found']:
+            flash('Class not found!', 'danger')
+        elif result['unknown_members']:
+            flash(f"Unknown member ID(s): {', '.join(map(str, result['unknown_members']))}!", 'danger')
+        else:
+            cache.delete('open_classes')
+            flash(f"Registered {result['added']} of {len(member_ids)} members!", 'success')
     except Exception as e:
-        flash(f'Error loading dashboard: {str(e)}', 'danger')
-        return redirect(url_for('index'))
-    finally:
-        return_db_connection(conn)
+        flash(f'Error: {str(e)}', 'danger')
+
+    return redirect(url_for('admin_dashboard'))
+
+
+@cache.cached(timeout=300, key_prefix='rooms_list')
+def get_rooms():
+    """All rooms; there is no room editing in the app, so a 5 minute cache is safe."""
+    with get_conn() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT room_id, room_name, capacity, room_type FROM Room ORDER BY room_id")
+        return cursor.fetchall()
 
 
 @app.route('/admin/rooms')
 @login_required('admin')
 def admin_rooms():
-    conn = None
-
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT room_id, room_name, capacity, room_type FROM Room ORDER BY room_id")
-        rooms = cursor.fetchall()
-        cursor.close()
-        return render_template('admin/rooms.html', rooms=rooms)
+        return render_conditional('admin/rooms.html', rooms=get_rooms())
     except Exception as e:
         flash(f'Error: {str(e)}', 'danger')
         return redirect(url_for('admin_dashboard'))
-    finally:
-        return_db_connection(conn)
+
+
+# Rows per page on the admin equipment and billing listings
+PAGE_SIZE = 50
 
 
 @app.route('/admin/equipment', methods=['GET', 'POST'])
@@ -881,53 +1308,56 @@ def admin_equipment():
     if request.method == 'POST':
         action       = request.form.get('action')
         equipment_id = request.form.get('equipment_id')
-        conn = None
 
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
+            with get_conn() as conn, conn.cursor() as cursor:
+                if action == 'update_status':
+                    status = request.form.get('status')
+                    notes  = request.form.get('notes')
+                    cursor.execute("""
+                        UPDATE Equipment
+                        SET status = %s, maintenance_notes = %s, last_maintenance_date = CURRENT_DATE
+                        WHERE equipment_id = %s
+                    """, (status, notes, equipment_id))
+                    conn.commit()
+                    flash('Equipment status updated!', 'success')
 
-            if action == 'update_status':
-                status = request.form.get('status')
-                notes  = request.form.get('notes')
-                cursor.execute("""
-                    UPDATE Equipment
-                    SET status = %s, maintenance_notes = %s, last_maintenance_date = CURRENT_DATE
-                    WHERE equipment_id = %s
-                """, (status, notes, equipment_id))
-                conn.commit()
-                flash('Equipment status updated!', 'success')
-
-            cursor.close()
         except Exception as e:
-            if conn:
-                conn.rollback()
             flash(f'Error: {str(e)}', 'danger')
-        finally:
-            return_db_connection(conn)
 
         return redirect(url_for('admin_equipment'))
 
     # GET
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT e.equipment_id, e.equipment_name, r.room_name, e.status,
-                   e.last_maintenance_date, e.maintenance_notes
-            FROM Equipment e
-            LEFT JOIN Room r ON e.room_id = r.room_id
-            ORDER BY e.status DESC, e.equipment_name
-        """)
-        equipment = cursor.fetchall()
-        cursor.close()
-        return render_template('admin/equipment.html', equipment=equipment)
+        # Keyset pagination: the next page starts after the last row shown,
+        # so deep pages cost the same as the first
+        after_status = request.args.get('after_status')
+        after_id     = request.args.get('after_id', type=int)
+        keyset = "WHERE (e.status, e.equipment_id) < (%s, %s)" if after_status and after_id else ""
+        params = (after_status, after_id, PAGE_SIZE + 1) if keyset else (PAGE_SIZE + 1,)
+
+        with get_conn() as conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT e.equipment_id, e.equipment_name, r.room_name, e.status,
+                       e.last_maintenance_date, e.maintenance_notes
+                FROM Equipment e
+                LEFT JOIN Room r ON e.room_id = r.room_id
+                {keyset}
+                ORDER BY e.status DESC, e.equipment_id DESC
+                LIMIT %s
+            """, params)
+            equipment = cursor.fetchall()
+
+        next_page = None
+        if len(equipment) > PAGE_SIZE:
+            equipment = equipment[:PAGE_SIZE]
+            next_page = url_for('admin_equipment', after_status=equipment[-1]['status'],
+                                after_id=equipment[-1]['equipment_id'])
+
+        return render_conditional('admin/equipment.html', equipment=equipment, next_page=next_page)
     except Exception as e:
         flash(f'Error: {str(e)}', 'danger')
         return redirect(url_for('admin_dashboard'))
-    finally:
-        return_db_connection(conn)
 
 
 @app.route('/admin/billing', methods=['GET', 'POST'])
@@ -935,67 +1365,75 @@ def admin_equipment():
 def admin_billing():
     if request.method == 'POST':
         action = request.form.get('action')
-        conn = None
 
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            if action == 'generate_bill':
-                member_id   = request.form.get('member_id')
-                description = request.form.get('description')
-                amount      = request.form.get('amount')
-                due_days    = request.form.get('due_days')
-                cursor.execute("""
-                    INSERT INTO Bill (member_id, due_date, total_amount, description)
-                    VALUES (%s, CURRENT_DATE + INTERVAL '%s days', %s, %s)
-                """, (member_id, due_days, amount, description))
-                conn.commit()
-                flash('Bill generated successfully!', 'success')
+        if action == 'generate_bill':
+            try:
+                due_days = int(request.form.get('due_days'))
+            except (TypeError, ValueError):
+                flash('Due days must be a whole number!', 'danger')
+                return redirect(url_for('admin_billing'))
 
-            elif action == 'record_payment':
-                bill_id   = request.form.get('bill_id')
-                amount    = request.form.get('amount')
-                method    = request.form.get('payment_method')
-                reference = request.form.get('reference')
-                cursor.execute("""
-                    INSERT INTO Payment (bill_id, amount, payment_method, transaction_reference)
-                    VALUES (%s, %s, %s, %s)
-                """, (bill_id, amount, method, reference if reference else None))
-                conn.commit()
-                flash('Payment recorded successfully!', 'success')
+        try:
+            with get_conn() as conn, conn.cursor() as cursor:
+                if action == 'generate_bill':
+                    member_id   = request.form.get('member_id')
+                    description = request.form.get('description')
+                    amount      = request.form.get('amount')
+                    cursor.execute("""
+                        INSERT INTO Bill (member_id, due_date, total_amount, description)
+                        VALUES (%s, CURRENT_DATE + %s::int, %s, %s)
+                    """, (member_id, due_days, amount, description))
+                    conn.commit()
+                    cache.delete('admin_stats')
+                    flash('Bill generated successfully!', 'success')
+
+                elif action == 'record_payment':
+                    bill_id   = request.form.get('bill_id')
+                    amount    = request.form.get('amount')
+                    method    = request.form.get('payment_method')
+                    reference = request.form.get('reference')
+                    cursor.execute("""
+                        INSERT INTO Payment (bill_id, amount, payment_method, transaction_reference)
+                        VALUES (%s, %s, %s, %s)
+                    """, (bill_id, amount, method, reference if reference else None))
+                    conn.commit()
+                    cache.delete('admin_stats')
+                    flash('Payment recorded successfully!', 'success')
 
-            cursor.close()
         except Exception as e:
-            if conn:
-                conn.rollback()
             flash(f'Error: {str(e)}', 'danger')
-        finally:
-            return_db_connection(conn)
 
         return redirect(url_for('admin_billing'))
 
     # GET
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT b.bill_id, m.first_name || ' ' || m.last_name as member_name,
-                   b.bill_date, b.due_date, b.total_amount, b.amount_paid,
-                   b.status, b.description
-            FROM Bill b
-            JOIN Member m ON b.member_id = m.member_id
-            ORDER BY b.bill_date DESC LIMIT 50
-        """)
-        bills = cursor.fetchall()
-        cursor.close()
-        return render_template('admin/billing.html', bills=bills)
+        before_date = request.args.get('before_date')
+        before_id   = request.args.get('before_id', type=int)
+        keyset = "WHERE (b.bill_date, b.bill_id) < (%s, %s)" if before_date and before_id else ""
+        params = (before_date, before_id, PAGE_SIZE + 1) if keyset else (PAGE_SIZE + 1,)
+
+        with get_conn() as conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT b.bill_id, m.full_name as member_name,
+                       b.bill_date, b.due_date, b.total_amount, b.amount_paid, b.status
+                FROM Bill b
+                JOIN Member m ON b.member_id = m.member_id
+                {keyset}
+                ORDER BY b.bill_date DESC, b.bill_id DESC
+                LIMIT %s
+            """, params)
+            bills = cursor.fetchall()
+
+        next_page = None
+        if len(bills) > PAGE_SIZE:
+            bills = bills[:PAGE_SIZE]
+            next_page = url_for('admin_billing', before_date=bills[-1]['bill_date'].isoformat(),
+                                before_id=bills[-1]['bill_id'])
+
+        return render_template('admin/billing.html', bills=bills, next_page=next_page)
     except Exception as e:
         flash(f'Error: {str(e)}', 'danger')
         return redirect(url_for('admin_dashboard'))
-    finally:
-        return_db_connection(conn)
 
 
 # ============================================================================
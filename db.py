@@ -0,0 +1,44 @@
+"""
+Database helpers shared by app.py and migrate_passwords.py.
+Importing this module has no side effects: no pool, no connections, no
+background threads.
+"""
+
+import os
+from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
+
+
+def get_ssl_url(database_url):
+    """Add sslmode=require to DATABASE_URL if not already present."""
+    if database_url.startswith("postgres://") or database_url.startswith("postgresql://"):
+        url = urlparse(database_url)
+        qs = parse_qs(url.query)
+        if "sslmode" not in qs:
+            qs["sslmode"] = ["require"]
+        url = url._replace(query=urlencode(qs, doseq=True))
+        return urlunparse(url)
+    return database_url
+
+
+def get_conninfo(direct=False):
+    """
+    Connection string from DATABASE_URL, or built from the DB_* variables.
+    direct=True prefers DATABASE_DIRECT_URL, for sessions that must bypass a
+    transaction-pooling PgBouncer: the per-worker dashboard LISTEN connection.
+    """
+    database_url = (direct and os.environ.get("DATABASE_DIRECT_URL")) or os.environ.get("DATABASE_URL")
+
+    if not database_url:
+        return (
+            f"host={os.environ.get('DB_HOST', 'localhost')} "
+            f"dbname={os.environ.get('DB_NAME', 'fitness_club')} "
+            f"user={os.environ.get('DB_USER', 'postgres')} "
+            f"password={os.environ.get('DB_PASSWORD', '')} "
+            f"port={os.environ.get('DB_PORT', '5432')}"
+        )
+    return get_ssl_url(database_url)
+
+
+def is_password_hashed(stored_password: str) -> bool:
+    """True if the stored value is a werkzeug hash rather than legacy plain text."""
+    return stored_password.startswith("pbkdf2:") or stored_password.startswith("scrypt:")
@@ -0,0 +1,36 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app`.
+
+Requests spend most of their time waiting on Postgres, and every open member
+dashboard holds a /member/events stream for as long as the tab is open, so
+workers are cooperative: gevent runs each request in a greenlet and switches
+away whenever one blocks on a socket. psycopg 3 cooperates with gevent's
+monkey-patching natively (no psycogreen needed); the gevent worker patches
+before app.py is imported, since the app isn't preloaded.
+
+Set GUNICORN_WORKER_CLASS=gthread to fall back to a fixed pool of threads per
+worker, e.g. where gevent can't be installed.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+# Each worker imports app.py and opens its own connection pool, so keep
+# workers * max_size under the database's connection limit.
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+
+# gevent: concurrent requests per worker. Requests beyond the pool's
+# max_size=20 wait for a connection; event streams don't take one.
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+# gthread: threads per worker
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Not preloaded: app.py opens the pool and starts the dashboard refresher at
+# import time, and those must be created inside each worker, not before fork.
+preload_app = False
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
@@ -0,0 +1,49 @@
+"""
+One-shot migration: replace every legacy plain-text password (as loaded by
+sql/DML.sql) with a werkzeug hash, for members, trainers and admins alike.
+
+Logins already re-hash a plain-text password the first time its owner signs
+in; this covers the accounts that haven't logged in since. Safe to re-run,
+already-hashed rows are left alone.
+
+    python migrate_passwords.py
+
+Connects with the same DATABASE_URL / DB_* variables as app.py, through the
+shared helpers in db.py. It doesn't import app.py: that would open the
+connection pool and start the app's background jobs just to run a script.
+"""
+
+import psycopg
+from psycopg.rows import dict_row
+from werkzeug.security import generate_password_hash
+
+from db import get_conninfo, is_password_hashed
+
+USER_TABLES = (('Member', 'member_id'), ('Trainer', 'trainer_id'), ('AdminStaff', 'admin_id'))
+
+
+def migrate_table(conn, table, id_column):
+    """
+    Hash the table's plain-text passwords; returns how many were migrated.
+    Hashing takes a few hundred ms per password, so it happens between two
+    short transactions rather than inside one that sits idle meanwhile.
+    """
+    with conn.transaction():
+        rows = conn.execute(f"SELECT {id_column}, password FROM {table}").fetchall()
+
+    legacy = [(generate_password_hash(row['password']), row[id_column])
+              for row in rows if not is_password_hashed(row['password'])]
+
+    with conn.transaction(), conn.cursor() as cursor:
+        # Only rows still in plain text, in case the owner logged in meanwhile
+        cursor.executemany(f"""
+            UPDATE {table} SET password = %s
+            WHERE {id_column} = %s AND password NOT LIKE 'pbkdf2:%%' AND password NOT LIKE 'scrypt:%%'
+        """, legacy)
+    return len(legacy)
+
+
+if __name__ == '__main__':
+    with psycopg.connect(get_conninfo(), autocommit=True, row_factory=dict_row) as conn:
+        for table, id_column in USER_TABLES:
+            print(f"{table}: {migrate_table(conn, table, id_column)} password(s) hashed")
@@ -15,6 +15,10 @@ DROP TABLE IF EXISTS Room CASCADE;
 DROP TABLE IF EXISTS Trainer CASCADE;
 DROP TABLE IF EXISTS Member CASCADE;
 DROP TABLE IF EXISTS AdminStaff CASCADE;
+DROP TABLE IF EXISTS MemberDashboardRefreshQueue CASCADE;
+
+-- btree_gist lets exclusion constraints mix scalar equality with range overlap
+CREATE EXTENSION IF NOT EXISTS btree_gist;
 
 -- Member Table
 CREATE TABLE Member (
@@ -23,6 +27,8 @@ CREATE TABLE Member (
     password VARCHAR(255) NOT NULL,
     first_name VARCHAR(100) NOT NULL,
     last_name VARCHAR(100) NOT NULL,
+    -- Display name, kept in step by Postgres so queries don't concatenate per row
+    full_name VARCHAR(201) GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED,
     date_of_birth DATE NOT NULL,
     gender VARCHAR(20),
     phone VARCHAR(20),
@@ -38,6 +44,7 @@ CREATE TABLE Trainer (
     password VARCHAR(255) NOT NULL,
     first_name VARCHAR(100) NOT NULL,
     last_name VARCHAR(100) NOT NULL,
+    full_name VARCHAR(201) GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED,
     specialization VARCHAR(100),
     phone VARCHAR(20),
     hire_date DATE DEFAULT CURRENT_DATE
@@ -50,6 +57,7 @@ CREATE TABLE AdminStaff (
     password VARCHAR(255) NOT NULL,
     first_name VARCHAR(100) NOT NULL,
     last_name VARCHAR(100) NOT NULL,
+    full_name VARCHAR(201) GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED,
     role VARCHAR(50) NOT NULL,
     phone VARCHAR(20)
 );
@@ -68,7 +76,7 @@ CREATE TABLE Equipment (
     room_id INT REFERENCES Room(room_id) ON DELETE SET NULL,
     equipment_name VARCHAR(100) NOT NULL,
     purchase_date DATE,
-    status VARCHAR(50) DEFAULT 'Operational',
+    status VARCHAR(50) NOT NULL DEFAULT 'Operational',
     last_maintenance_date DATE,
     maintenance_notes TEXT,
     CONSTRAINT valid_status CHECK (status IN ('Operational', 'Under Maintenance', 'Out of Service'))
@@ -104,10 +112,10 @@ CREATE TABLE HealthMetric (
 CREATE TABLE TrainerAvailability (
     availability_id SERIAL PRIMARY KEY,
     trainer_id INT REFERENCES Trainer(trainer_id) ON DELETE CASCADE,
-    day_of_week VARCHAR(20) NOT NULL,
+    day_of_week SMALLINT NOT NULL,  -- ISO weekday: 1 = Monday ... 7 = Sunday
     start_time TIME NOT NULL,
     end_time TIME NOT NULL,
-    CONSTRAINT valid_day CHECK (day_of_week IN ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')),
+    CONSTRAINT valid_day CHECK (day_of_week BETWEEN 1 AND 7),
     CONSTRAINT valid_time_range CHECK (start_time < end_time),
     CONSTRAINT no_overlap UNIQUE (trainer_id, day_of_week, start_time, end_time)
 );
@@ -141,7 +149,12 @@ CREATE TABLE PersonalTrainingSession (
     status VARCHAR(50) DEFAULT 'Scheduled',
     notes TEXT,
     CONSTRAINT valid_session_time CHECK (start_time < end_time),
-    CONSTRAINT valid_session_status CHECK (status IN ('Scheduled', 'Completed', 'Cancelled'))
+    CONSTRAINT valid_session_status CHECK (status IN ('Scheduled', 'Completed', 'Cancelled')),
+    -- A trainer can never have two overlapping scheduled sessions
+    CONSTRAINT no_trainer_double_booking EXCLUDE USING gist (
+        trainer_id WITH =,
+        tsrange(session_date + start_time, session_date + end_time) WITH &&
+    ) WHERE (status = 'Scheduled')
 );
 
 -- Class Registration Table
@@ -159,7 +172,7 @@ CREATE TABLE ClassRegistration (
 CREATE TABLE Bill (
     bill_id SERIAL PRIMARY KEY,
     member_id INT REFERENCES Member(member_id) ON DELETE CASCADE,
-    bill_date DATE DEFAULT CURRENT_DATE,
+    bill_date DATE NOT NULL DEFAULT CURRENT_DATE,
     due_date DATE NOT NULL,
     total_amount DECIMAL(10, 2) NOT NULL CHECK (total_amount >= 0),
     amount_paid DECIMAL(10, 2) DEFAULT 0 CHECK (amount_paid >= 0),
@@ -180,14 +193,53 @@ CREATE TABLE Payment (
 );
 
 -- Create Index for performance optimization
-CREATE INDEX idx_member_email ON Member(email);
-CREATE INDEX idx_health_metric_member_date ON HealthMetric(member_id, recorded_date DESC);
+-- Logins and registration match email case-insensitively via lower(email)
+CREATE UNIQUE INDEX idx_member_email_lower ON Member(lower(email));
+CREATE UNIQUE INDEX idx_trainer_email_lower ON Trainer(lower(email));
+CREATE UNIQUE INDEX idx_admin_email_lower ON AdminStaff(lower(email));
+-- Latest-metric lookups read the newest row per member straight from the index
+CREATE INDEX idx_health_metric_member_date ON HealthMetric(member_id, recorded_date DESC)
+    INCLUDE (weight, height, heart_rate, blood_pressure, body_fat_percentage);
 CREATE INDEX idx_class_schedule ON Class(schedule_date, start_time);
 CREATE INDEX idx_session_trainer_date ON PersonalTrainingSession(trainer_id, session_date);
+-- Trainer's member list: index-only EXISTS probe per member
+CREATE INDEX idx_session_trainer_member ON PersonalTrainingSession(trainer_id, member_id);
+
+-- Partial indexes matching the upcoming-schedule predicates used by the
+-- member dashboard, trainer schedule and class listing
+CREATE INDEX idx_session_member_upcoming ON PersonalTrainingSession(member_id, session_date, start_time)
+    WHERE status = 'Scheduled';
+CREATE INDEX idx_session_trainer_upcoming ON PersonalTrainingSession(trainer_id, session_date, start_time)
+    WHERE status = 'Scheduled';
+CREATE INDEX idx_class_trainer_upcoming ON Class(trainer_id, schedule_date, start_time)
+    WHERE status = 'Scheduled';
+CREATE INDEX idx_class_open ON Class(schedule_date, start_time)
+    WHERE status = 'Scheduled' AND current_enrollment < capacity;
+CREATE INDEX idx_registration_member_active ON ClassRegistration(member_id, class_id)
+    WHERE status = 'Registered';
+-- Active-goal and pending-bill lookups (dashboard counts, trainer member
+-- list, admin pending revenue); amounts are carried so sums stay index-only
+CREATE INDEX idx_goal_member_active ON FitnessGoal(member_id)
+    WHERE status = 'Active';
+CREATE INDEX idx_bill_member_pending ON Bill(member_id) INCLUDE (total_amount, amount_paid)
+    WHERE status = 'Pending';
+
+-- Keyset pagination order for the admin equipment and billing listings
+CREATE INDEX idx_equipment_status ON Equipment(status, equipment_id);
+CREATE INDEX idx_bill_date ON Bill(bill_date, bill_id);
 
--- Create View: Member Dashboard Summary
-CREATE OR REPLACE VIEW MemberDashboard AS
-SELECT 
+-- Room conflict probe for bookings; the trainer side is served by the
+-- no_trainer_double_booking exclusion constraint's index
+CREATE INDEX idx_session_room_slot ON PersonalTrainingSession USING gist (
+    room_id,
+    tsrange(session_date + start_time, session_date + end_time)
+) WHERE status = 'Scheduled';
+
+-- Create Materialized View: Member Dashboard Summary
+-- Aggregated once per batch of writes instead of on every dashboard hit;
+-- see MemberDashboardRefreshQueue below for how refreshes are scheduled.
+CREATE MATERIALIZED VIEW MemberDashboard AS
+SELECT
     m.member_id,
     m.first_name,
     m.last_name,
@@ -209,6 +261,58 @@ SELECT
      WHERE member_id = m.member_id AND status = 'Pending') AS pending_balance
 FROM Member m;
 
+-- Unique index: makes the dashboard lookup an index probe and is required
+-- for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX idx_member_dashboard_member ON MemberDashboard(member_id);
+
+-- Dashboard refresh queue: writes to any table feeding MemberDashboard enqueue
+-- a row; the app's background refresher drains the queue every 30 seconds and
+-- runs one REFRESH MATERIALIZED VIEW CONCURRENTLY per batch.
+CREATE TABLE MemberDashboardRefreshQueue (
+    member_id INT NOT NULL,
+    queued_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Queues the member whose dashboard row changed. After the refresh the app
+-- NOTIFYs member_dashboard with each queued member_id, so an open dashboard
+-- reloads only once the view actually shows the change.
+CREATE OR REPLACE FUNCTION queue_member_dashboard_refresh()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO MemberDashboardRefreshQueue (member_id) VALUES (OLD.member_id);
+    ELSE
+        INSERT INTO MemberDashboardRefreshQueue (member_id) VALUES (NEW.member_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER member_dashboard_refresh_member
+AFTER INSERT OR UPDATE OR DELETE ON Member
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+CREATE TRIGGER member_dashboard_refresh_metric
+AFTER INSERT OR UPDATE OR DELETE ON HealthMetric
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+CREATE TRIGGER member_dashboard_refresh_goal
+AFTER INSERT OR UPDATE OR DELETE ON FitnessGoal
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+CREATE TRIGGER member_dashboard_refresh_session
+AFTER INSERT OR UPDATE OR DELETE ON PersonalTrainingSession
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+CREATE TRIGGER member_dashboard_refresh_registration
+AFTER INSERT OR UPDATE OR DELETE ON ClassRegistration
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+-- Payments reach the dashboard through the Bill update in update_bill_status()
+CREATE TRIGGER member_dashboard_refresh_bill
+AFTER INSERT OR UPDATE OR DELETE ON Bill
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
 -- Trigger: Automatically update class enrollment count
 CREATE OR REPLACE FUNCTION update_class_enrollment()
 RETURNS TRIGGER AS $$
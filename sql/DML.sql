@@ -58,18 +58,18 @@ INSERT INTO HealthMetric (member_id, recorded_date, weight, height, heart_rate,
 
 -- Insert Trainer Availability
 INSERT INTO TrainerAvailability (trainer_id, day_of_week, start_time, end_time) VALUES
-(1, 'Monday', '09:00:00', '17:00:00'),
-(1, 'Tuesday', '09:00:00', '17:00:00'),
-(1, 'Wednesday', '09:00:00', '17:00:00'),
-(1, 'Thursday', '09:00:00', '17:00:00'),
-(1, 'Friday', '09:00:00', '15:00:00'),
-(2, 'Monday', '10:00:00', '18:00:00'),
-(2, 'Wednesday', '10:00:00', '18:00:00'),
-(2, 'Friday', '10:00:00', '18:00:00'),
-(2, 'Saturday', '08:00:00', '14:00:00'),
-(3, 'Tuesday', '08:00:00', '16:00:00'),
-(3, 'Thursday', '08:00:00', '16:00:00'),
-(3, 'Saturday', '09:00:00', '15:00:00');
+(1, 1, '09:00:00', '17:00:00'),
+(1, 2, '09:00:00', '17:00:00'),
+(1, 3, '09:00:00', '17:00:00'),
+(1, 4, '09:00:00', '17:00:00'),
+(1, 5, '09:00:00', '15:00:00'),
+(2, 1, '10:00:00', '18:00:00'),
+(2, 3, '10:00:00', '18:00:00'),
+(2, 5, '10:00:00', '18:00:00'),
+(2, 6, '08:00:00', '14:00:00'),
+(3, 2, '08:00:00', '16:00:00'),
+(3, 4, '08:00:00', '16:00:00'),
+(3, 6, '09:00:00', '15:00:00');
 
 -- Insert Classes
 INSERT INTO Class (class_name, trainer_id, room_id, schedule_date, start_time, end_time, capacity, current_enrollment, status) VALUES
@@ -0,0 +1,197 @@
+-- Health and Fitness Club Management System
+-- Schema upgrade for an existing database
+
+-- Brings a database created from an earlier DDL.sql up to the current schema
+-- in place, keeping its data. DDL.sql drops and recreates every table, so use
+-- this instead on a database that already holds real data:
+--
+--     psql "$DATABASE_URL" -f sql/migrate_schema.sql
+--
+-- Every step checks the current state first, so the script is safe to re-run
+-- and runs as one transaction: if any step fails, nothing is changed.
+
+BEGIN;
+
+-- btree_gist lets exclusion constraints mix scalar equality with range overlap
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- Display names, kept in step by Postgres
+ALTER TABLE Member ADD COLUMN IF NOT EXISTS
+    full_name VARCHAR(201) GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED;
+ALTER TABLE Trainer ADD COLUMN IF NOT EXISTS
+    full_name VARCHAR(201) GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED;
+ALTER TABLE AdminStaff ADD COLUMN IF NOT EXISTS
+    full_name VARCHAR(201) GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED;
+
+-- Keyset pagination columns can't be NULL; fill gaps with the column defaults
+UPDATE Equipment SET status = 'Operational' WHERE status IS NULL;
+ALTER TABLE Equipment ALTER COLUMN status SET NOT NULL;
+UPDATE Bill SET bill_date = CURRENT_DATE WHERE bill_date IS NULL;
+ALTER TABLE Bill ALTER COLUMN bill_date SET NOT NULL;
+
+-- TrainerAvailability.day_of_week: day name -> ISO weekday (1 = Monday ... 7 = Sunday).
+-- Dropping the old column also drops the valid_day and no_overlap constraints
+-- built on it, so both are re-added on the new column.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_schema = current_schema() AND table_name = 'traineravailability'
+                 AND column_name = 'day_of_week' AND data_type <> 'smallint') THEN
+        ALTER TABLE TrainerAvailability ADD COLUMN dow SMALLINT;
+        UPDATE TrainerAvailability SET dow = CASE day_of_week
+            WHEN 'Monday' THEN 1
+            WHEN 'Tuesday' THEN 2
+            WHEN 'Wednesday' THEN 3
+            WHEN 'Thursday' THEN 4
+            WHEN 'Friday' THEN 5
+            WHEN 'Saturday' THEN 6
+            WHEN 'Sunday' THEN 7
+        END;
+        ALTER TABLE TrainerAvailability DROP COLUMN day_of_week;
+        ALTER TABLE TrainerAvailability RENAME COLUMN dow TO day_of_week;
+        ALTER TABLE TrainerAvailability
+            ALTER COLUMN day_of_week SET NOT NULL,
+            ADD CONSTRAINT valid_day CHECK (day_of_week BETWEEN 1 AND 7),
+            ADD CONSTRAINT no_overlap UNIQUE (trainer_id, day_of_week, start_time, end_time);
+    END IF;
+END $$;
+
+-- A trainer can never have two overlapping scheduled sessions. Fails if the
+-- existing data already double-books a trainer; cancel one of each pair first.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'no_trainer_double_booking') THEN
+        ALTER TABLE PersonalTrainingSession ADD CONSTRAINT no_trainer_double_booking EXCLUDE USING gist (
+            trainer_id WITH =,
+            tsrange(session_date + start_time, session_date + end_time) WITH &&
+        ) WHERE (status = 'Scheduled');
+    END IF;
+END $$;
+
+-- Case-insensitive email lookups. Fails if two accounts of the same kind
+-- share an email up to case; merge or rename them first.
+DROP INDEX IF EXISTS idx_member_email;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_member_email_lower ON Member(lower(email));
+CREATE UNIQUE INDEX IF NOT EXISTS idx_trainer_email_lower ON Trainer(lower(email));
+CREATE UNIQUE INDEX IF NOT EXISTS idx_admin_email_lower ON AdminStaff(lower(email));
+
+-- The latest-metric index now carries the metric columns; rebuild it if it doesn't
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_index
+               WHERE indexrelid = to_regclass('idx_health_metric_member_date')
+                 AND indnatts = indnkeyatts) THEN
+        DROP INDEX idx_health_metric_member_date;
+    END IF;
+END $$;
+CREATE INDEX IF NOT EXISTS idx_health_metric_member_date ON HealthMetric(member_id, recorded_date DESC)
+    INCLUDE (weight, height, heart_rate, blood_pressure, body_fat_percentage);
+
+CREATE INDEX IF NOT EXISTS idx_session_trainer_member ON PersonalTrainingSession(trainer_id, member_id);
+CREATE INDEX IF NOT EXISTS idx_session_member_upcoming ON PersonalTrainingSession(member_id, session_date, start_time)
+    WHERE status = 'Scheduled';
+CREATE INDEX IF NOT EXISTS idx_session_trainer_upcoming ON PersonalTrainingSession(trainer_id, session_date, start_time)
+    WHERE status = 'Scheduled';
+CREATE INDEX IF NOT EXISTS idx_class_trainer_upcoming ON Class(trainer_id, schedule_date, start_time)
+    WHERE status = 'Scheduled';
+CREATE INDEX IF NOT EXISTS idx_class_open ON Class(schedule_date, start_time)
+    WHERE status = 'Scheduled' AND current_enrollment < capacity;
+CREATE INDEX IF NOT EXISTS idx_registration_member_active ON ClassRegistration(member_id, class_id)
+    WHERE status = 'Registered';
+CREATE INDEX IF NOT EXISTS idx_goal_member_active ON FitnessGoal(member_id)
+    WHERE status = 'Active';
+CREATE INDEX IF NOT EXISTS idx_bill_member_pending ON Bill(member_id) INCLUDE (total_amount, amount_paid)
+    WHERE status = 'Pending';
+CREATE INDEX IF NOT EXISTS idx_equipment_status ON Equipment(status, equipment_id);
+CREATE INDEX IF NOT EXISTS idx_bill_date ON Bill(bill_date, bill_id);
+CREATE INDEX IF NOT EXISTS idx_session_room_slot ON PersonalTrainingSession USING gist (
+    room_id,
+    tsrange(session_date + start_time, session_date + end_time)
+) WHERE status = 'Scheduled';
+
+-- MemberDashboard: plain view -> materialized view
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('memberdashboard') AND relkind = 'v') THEN
+        DROP VIEW MemberDashboard;
+    END IF;
+END $$;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS MemberDashboard AS
+SELECT
+    m.member_id,
+    m.first_name,
+    m.last_name,
+    m.email,
+    -- Latest health metrics
+    (SELECT weight FROM HealthMetric WHERE member_id = m.member_id ORDER BY recorded_date DESC LIMIT 1) AS latest_weight,
+    (SELECT heart_rate FROM HealthMetric WHERE member_id = m.member_id ORDER BY recorded_date DESC LIMIT 1) AS latest_heart_rate,
+    (SELECT recorded_date FROM HealthMetric WHERE member_id = m.member_id ORDER BY recorded_date DESC LIMIT 1) AS last_metric_date,
+    -- Active goals count
+    (SELECT COUNT(*) FROM FitnessGoal WHERE member_id = m.member_id AND status = 'Active') AS active_goals,
+    -- Upcoming sessions count
+    (SELECT COUNT(*) FROM PersonalTrainingSession
+     WHERE member_id = m.member_id AND session_date >= CURRENT_DATE AND status = 'Scheduled') AS upcoming_sessions,
+    -- Total classes attended
+    (SELECT COUNT(*) FROM ClassRegistration
+     WHERE member_id = m.member_id AND status = 'Attended') AS classes_attended,
+    -- Pending bill amount
+    (SELECT COALESCE(SUM(total_amount - amount_paid), 0) FROM Bill
+     WHERE member_id = m.member_id AND status = 'Pending') AS pending_balance
+FROM Member m;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_member_dashboard_member ON MemberDashboard(member_id);
+
+-- Dashboard refresh queue. Earlier versions queued whole-view refreshes with
+-- no member_id and notified from per-table triggers; those queue rows are
+-- covered by the refresh at the end of this script.
+CREATE TABLE IF NOT EXISTS MemberDashboardRefreshQueue (
+    member_id INT NOT NULL,
+    queued_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+ALTER TABLE MemberDashboardRefreshQueue ADD COLUMN IF NOT EXISTS member_id INT;
+DELETE FROM MemberDashboardRefreshQueue WHERE member_id IS NULL;
+ALTER TABLE MemberDashboardRefreshQueue ALTER COLUMN member_id SET NOT NULL;
+
+DROP FUNCTION IF EXISTS notify_member_change() CASCADE;
+
+CREATE OR REPLACE FUNCTION queue_member_dashboard_refresh()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO MemberDashboardRefreshQueue (member_id) VALUES (OLD.member_id);
+    ELSE
+        INSERT INTO MemberDashboardRefreshQueue (member_id) VALUES (NEW.member_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER member_dashboard_refresh_member
+AFTER INSERT OR UPDATE OR DELETE ON Member
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+CREATE OR REPLACE TRIGGER member_dashboard_refresh_metric
+AFTER INSERT OR UPDATE OR DELETE ON HealthMetric
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+CREATE OR REPLACE TRIGGER member_dashboard_refresh_goal
+AFTER INSERT OR UPDATE OR DELETE ON FitnessGoal
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+CREATE OR REPLACE TRIGGER member_dashboard_refresh_session
+AFTER INSERT OR UPDATE OR DELETE ON PersonalTrainingSession
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+CREATE OR REPLACE TRIGGER member_dashboard_refresh_registration
+AFTER INSERT OR UPDATE OR DELETE ON ClassRegistration
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+-- Payments reach the dashboard through the Bill update in update_bill_status()
+CREATE OR REPLACE TRIGGER member_dashboard_refresh_bill
+AFTER INSERT OR UPDATE OR DELETE ON Bill
+FOR EACH ROW EXECUTE FUNCTION queue_member_dashboard_refresh();
+
+REFRESH MATERIALIZED VIEW MemberDashboard;
+
+COMMIT;